@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Dict, Any
+from functools import cached_property
+from typing import Dict, Any, Set
 
 from cocotb.handle import (
     HierarchyArrayObject,
@@ -18,6 +19,13 @@ class HDLNode:
     py_type: str
     width: int | None
     is_scope: bool
+    
+    @property
+    def logic_array_width(self) -> int | None:
+        """Get the width of a LogicArray signal, or None for any other node."""
+        if self.is_scope or self.width is None or "LogicArrayObject" not in self.py_type:
+            return None
+        return self.width
 
 class HierarchyDict(Dict[str, Any]):
     """A mutating dictionary that builds hierarchy iteratively during discovery."""
@@ -69,7 +77,13 @@ class HierarchyDict(Dict[str, Any]):
             return isinstance(obj, (HierarchyObject, HierarchyArrayObject))
     
     def _build_tree_node(self, node: HDLNode) -> None:
-        """Build tree structure for a single node as it's discovered."""
+        """Build tree structure for a single node as it's discovered.
+
+        Must run every time a node is added to ``_nodes``: it also drops the cached
+        ``logic_widths`` so they are rebuilt from the updated nodes.
+        """
+        self.__dict__.pop("logic_widths", None)
+        
         path_parts = node.path.split(".")
         current = self._tree
         
@@ -89,6 +103,14 @@ class HierarchyDict(Dict[str, Any]):
     def get_tree(self) -> Dict[str, Any]:
         """Get the built tree structure."""
         return self._tree
+    
+    @cached_property
+    def logic_widths(self) -> Set[int]:
+        """Get every unique LogicArray width used in the design, cached until a node is added."""
+        return {
+            width for width in (node.logic_array_width for node in self._nodes.values())
+            if width is not None
+        }
 
 class HierarchyDiscoverer:
     """Configurable hierarchy discovery system."""
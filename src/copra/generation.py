@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import os
+import sys
+from functools import lru_cache
 from pathlib import Path
-from textwrap import indent
 from typing import Dict, List, Set, Any, Tuple, Callable
 
-from .discovery import HierarchyDict
+from .discovery import HDLNode, HierarchyDict
 from .config import get_config
 from .introspection import sanitize_name
 
@@ -13,162 +15,164 @@ class StubGenerator:
     
     def __init__(self):
         self.config = get_config()
+        
+        # Constant per config, looked up for every scope and child during the walk
+        base_classes = self.config.types.base_classes
+        self._h_base = base_classes['hierarchy']
+        self._ha_base = base_classes['hierarchy_array']
+        self._ha_short = self._ha_base.rsplit('.', 1)[-1]
+        self._hdr_lines = tuple(self.config.output.header_lines)
+        self._root_cls = self.config.output.root_class_name
+        self._stub_name = self.config.output.stub_filename
+        self._imports = tuple(self.config.types.import_statements)
     
     def generate_stub(self, hierarchy: HierarchyDict, out_dir: Path) -> Path:
         """Generate comprehensive stub file from HierarchyDict with proper cocotb types."""
-        lines: list[str] = []
-        
-        # Imports
-        lines.extend(self.config.types.import_statements)
-        lines.append("from typing import NewType")
-        lines.append("")
-        
-        # We scan the flat list of nodes to find every unique LogicArray width used in the design
-        found_widths = set()
-        for node in hierarchy.get_nodes():
-            if node.width is not None and "LogicArrayObject" in getattr(node, "py_type", ""):
-                found_widths.add(node.width)
-
-        # We define unique types for each width (e.g., LogicArray8) to enable stricter type checking
-        for w in sorted(found_widths):
-            lines.append(f'LogicArray{w} = NewType("LogicArray{w}", cocotb.handle.LogicArrayObject)')
+        # Fail on an unusable output path before any work is done
+        if not out_dir.is_dir():
+            out_dir.mkdir(parents=True, exist_ok=True)
         
-        lines.append("")
+        # One interned alias name per width (e.g. LogicArray8), shared by the NewTypes and annotations
+        found_widths = hierarchy.logic_widths
+        width_names = {w: sys.intern(f"LogicArray{w}") for w in found_widths}
         
-        for header_line in self.config.output.header_lines:
-            lines.append(f"# {header_line}")
-        lines.append("")
+        # A scope's class name is needed for its own annotation and again when the walk emits
+        # its class; the cache lives only as long as this call
+        class_name = lru_cache(maxsize=None)(sanitize_name)
         
-        tree = hierarchy.get_tree()
-        if not tree:
-            lines.extend([
-                f"class {self.config.output.root_class_name}({self.config.types.base_classes['hierarchy']}):",
-                "    pass",
-                "",
-            ])
-        else:
-            top_key = list(tree.keys())[0]
-            top_tree = tree[top_key]
-            self._generate_classes(tree, lines, top_key, top_tree)
+        # Resolve each node's annotation once up front, keyed by node identity; the walk only
+        # reads them back and nothing is left attached to the discovered nodes
+        resolve_ann = self._resolve_ann
+        anns: Dict[int, str] = {
+            id(node): resolve_ann(node, node.path.rsplit(".", 1)[-1], width_names, class_name)
+            for node in hierarchy.get_nodes()
+        }
         
-        out_dir.mkdir(parents=True, exist_ok=True)
-        content = "\n".join(lines)
+        # Stream through a large buffer into a sibling temp file instead of building the whole
+        # stub in memory; only a complete stub replaces the previous one
+        stub_path = out_dir / self._stub_name
+        tmp_path = stub_path.with_name(f".{stub_path.name}.{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8", buffering=1 << 20) as f:
+                emit = f.write
+                
+                # Imports
+                for statement in self._imports:
+                    emit(f"{statement}\n")
+                
+                # We define unique types for each width (e.g., LogicArray8) to enable stricter type checking
+                if found_widths:
+                    emit("from typing import NewType\n")
+                    emit("\n")
+                    emit("".join(
+                        f'{width_names[w]} = NewType("{width_names[w]}", cocotb.handle.LogicArrayObject)\n'
+                        for w in sorted(found_widths)
+                    ))
+                
+                emit("\n")
+                
+                for header_line in self._hdr_lines:
+                    emit(f"# {header_line}\n")
+                emit("\n")
+                
+                tree = hierarchy.get_tree()
+                if not tree:
+                    emit(f"class {self._root_cls}({self._h_base}):\n    pass\n\n")
+                else:
+                    top_key = list(tree.keys())[0]
+                    top_tree = tree[top_key]
+                    self._generate_classes(tree, emit, top_key, top_tree, class_name, anns)
+            
+            os.replace(tmp_path, stub_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
-        stub_path = out_dir / self.config.output.stub_filename
-        stub_path.write_text(content, encoding="utf-8")
         return stub_path
 
-    def _generate_classes(self, tree, lines, top_key, top_tree):
-        top_node = top_tree.get("_node")
-        top_class_name = sanitize_name(top_key)
-        
-        base_class_key = 'hierarchy'
-        if top_node and self.config.types.base_classes['hierarchy_array'].split('.')[-1] in top_node.py_type:
-            base_class_key = 'hierarchy_array'
-        
-        base_class = self.config.types.base_classes[base_class_key]
-        lines.append(f"class {top_class_name}({base_class}):")
-        
-        children = top_tree.get("_children", {})
-        if not children:
-            lines.append("    pass")
-        else:
-            self._generate_class_attributes(lines, children, "    ")
-            self._generate_getitem_overloads(lines, children, "    ")
-        lines.append("")
+    def _generate_classes(self, tree: Dict[str, Any], emit: Callable[[str], Any], top_key: str, top_tree: Dict[str, Any], class_name: Callable[[str], str], anns: Dict[int, str]) -> None:
+        # Seeding with the top class keeps any same-named scope from redefining it
+        generated_classes: Set[str] = {class_name(top_key)}
         
-        generated_classes: Set[str] = set()
-        self._generate_meaningful_classes(tree, lines, generated_classes, top_class_name)
+        # The stack pops from the end: the top scope first, then any further roots in order
+        stack = [(name, subtree, False) for name, subtree in sorted(tree.items(), reverse=True) if name != top_key]
+        stack.append((top_key, top_tree, True))
+        self._walk(stack, emit, generated_classes, class_name, anns)
 
-    def _generate_class_attributes(self, lines: List[str], children: Dict[str, Any], indent_str: str, filter_deep_signals: bool = False) -> None:
-        for child_name, child_tree in sorted(children.items()):
-            if '[' in child_name and child_name.endswith(']'): continue
-            child_node = child_tree.get("_node")
-            if child_node:
-                if filter_deep_signals and not child_node.is_scope and child_node.path.count('.') > 1: continue
-                
-                can_be_attr = child_name.isidentifier() and (child_node.is_scope or not child_name.startswith('_'))
-                if can_be_attr:
-                    type_ann = child_node.py_type
-                    if child_node.is_scope:
-                        cls_name = sanitize_name(child_name)
-                        if self.config.types.base_classes['hierarchy_array'].split('.')[-1] in child_node.py_type:
-                            type_ann = child_node.py_type if "[" in child_node.py_type else f"{self.config.types.base_classes['hierarchy_array']}[{cls_name}]"
-                        else:
-                            type_ann = cls_name
-                    elif "LogicArrayObject" in type_ann and child_node.width is not None:
-                        type_ann = f"LogicArray{child_node.width}"
-                    
-                    lines.append(f"{indent_str}{child_name}: {type_ann}")
-
-    def _generate_getitem_overloads(self, lines: List[str], children: Dict[str, Any], indent_str: str, filter_deep_signals: bool = False) -> None:
-        overloads = []
-        for name, tree in children.items():
-            if '[' in name and name.endswith(']'): continue
-            node = tree.get("_node")
-            if node:
-                if filter_deep_signals and not node.is_scope and node.path.count('.') > 1: continue
-                
-                type_ann = node.py_type
-                if node.is_scope:
-                    cls = sanitize_name(name)
-                    base = self.config.types.base_classes['hierarchy_array']
-                    if base.split('.')[-1] in node.py_type:
-                        type_ann = node.py_type if "[" in node.py_type else f"{base}[{cls}]"
-                    else:
-                        type_ann = cls
-                # === FIX START: Update LogicArrayObject to use the specific LogicArrayX type ===
-                elif "LogicArrayObject" in type_ann and node.width is not None:
-                    type_ann = f"LogicArray{node.width}"
-                # === FIX END ===
-                
-                overloads.append((name, type_ann))
-        
-        if overloads:
-            lines.append("")
-            for n, t in overloads:
-                lines.append(f"{indent_str}@overload")
-                lines.append(f"{indent_str}def __getitem__(self, name: Literal[{repr(n)}]) -> {t}: ...")
-                lines.append("")
-            lines.append(f"{indent_str}@overload")
-            lines.append(f"{indent_str}def __getitem__(self, name: str) -> cocotb.handle.SimHandleBase: ...")
-            lines.append("")
+    def _walk(self, stack: List[Tuple[str, Dict[str, Any], bool]], emit: Callable[[str], Any], generated_classes: Set[str], class_name: Callable[[str], str], anns: Dict[int, str]) -> None:
+        """Emit the classes for the scopes on ``stack`` and everything beneath them.
 
-    def _generate_meaningful_classes(self, tree: Dict[str, Any], lines: List[str], generated_classes: Set[str], top_class_name: str) -> None:
-        for name, subtree in sorted(tree.items()):
+        The tree is walked depth first with an explicit stack, so deep hierarchies cannot
+        hit the recursion limit. Attributes, ``__getitem__`` overloads and the subtrees to
+        descend into are all collected from one iteration over each scope's children.
+        """
+        while stack:
+            name, subtree, is_top = stack.pop()
             node = subtree.get("_node")
             children = subtree.get("_children", {})
-            if node and node.is_scope and children and name != list(tree.keys())[0]:
-                cls_name = sanitize_name(name)
-                if cls_name not in generated_classes and cls_name != top_class_name:
-                    generated_classes.add(cls_name)
-                    base = self.config.types.base_classes['hierarchy_array' if self.config.types.base_classes['hierarchy_array'].split('.')[-1] in node.py_type else 'hierarchy']
-                    lines.append(f"class {cls_name}({base}):")
-                    
-                    has_children = False
-                    for cname, ctree in sorted(children.items()):
-                        if '[' in cname and cname.endswith(']'): continue
-                        cnode = ctree.get("_node")
-                        if cnode:
-                            has_children = True
-                            ctann = cnode.py_type
-                            if cnode.is_scope:
-                                ccls = sanitize_name(cname)
-                                if self.config.types.base_classes['hierarchy_array'].split('.')[-1] in cnode.py_type:
-                                    ctann = cnode.py_type if "[" in cnode.py_type else f"{self.config.types.base_classes['hierarchy_array']}[{ccls}]"
-                                else:
-                                    ctann = ccls
-                            # === FIX START: Also update nested attributes ===
-                            elif "LogicArrayObject" in ctann and cnode.width is not None:
-                                ctann = f"LogicArray{cnode.width}"
-                            # === FIX END ===
-                                
-                            lines.append(indent(f"{cname}: {ctann}", "    "))
+            cls_name = class_name(name)
+            emit_class = is_top or bool(
+                node and node.is_scope and children and cls_name not in generated_classes
+            )
+            
+            # Attributes and subtrees go out alphabetically, so the children are sorted once;
+            # overloads keep discovery order and are rebuilt from ``children`` afterwards
+            attributes: List[Tuple[str, str]] = []
+            getitem_anns: Dict[str, str] = {}
+            subtrees: List[Tuple[str, Dict[str, Any]]] = []
+            for child_name, child_tree in sorted(children.items()):
+                if child_tree["_children"]:
+                    subtrees.append((child_name, child_tree))
+                # Array elements (e.g. gen_regs[0]) are only descended into, never emitted;
+                # endswith() rejects ordinary names before the substring scan runs
+                if not emit_class or (child_name.endswith(']') and '[' in child_name): continue
+                child_node = child_tree["_node"]
+                if not child_node: continue
+                
+                type_ann = anns[id(child_node)]
+                
+                # Nested classes list every child; the top class only those usable as attributes
+                if not is_top or (child_name.isidentifier() and (child_node.is_scope or not child_name.startswith('_'))):
+                    attributes.append((child_name, type_ann))
+                getitem_anns[child_name] = type_ann
+            
+            if emit_class:
+                generated_classes.add(cls_name)
+                base_class = self._ha_base if node and self._is_hierarchy_array(node) else self._h_base
+                if not getitem_anns:
+                    # Scopes with nothing to list are written out in a single call
+                    emit(f"class {cls_name}({base_class}):\n    pass\n\n")
+                else:
+                    emit(f"class {cls_name}({base_class}):\n")
+                    for attr_name, type_ann in attributes:
+                        emit(f"    {attr_name}: {type_ann}\n")
                     
-                    if not has_children: lines.append("    pass")
-                    else: self._generate_getitem_overloads(lines, children, "    ")
-                    lines.append("")
-            self._generate_meaningful_classes(children, lines, generated_classes, top_class_name)
+                    emit("\n")
+                    emit("".join(
+                        f"    @overload\n    def __getitem__(self, name: Literal[{repr(n)}]) -> {getitem_anns[n]}: ...\n\n"
+                        for n in children if n in getitem_anns
+                    ))
+                    emit("    @overload\n    def __getitem__(self, name: str) -> cocotb.handle.SimHandleBase: ...\n\n")
+                    emit("\n")
+            
+            stack.extend((child_name, child_tree, False) for child_name, child_tree in reversed(subtrees))
+
+    def _resolve_ann(self, node: HDLNode, name: str, width_names: Dict[int, str], class_name: Callable[[str], str]) -> str:
+        """Resolve the annotation used for a node as an attribute and ``__getitem__`` result."""
+        py_type = node.py_type
+        if node.is_scope:
+            cls_name = class_name(name)
+            if self._is_hierarchy_array(node):
+                return py_type if "[" in py_type else f"{self._ha_base}[{cls_name}]"
+            return cls_name
+        width = node.logic_array_width
+        if width is not None:
+            return width_names[width]
+        return py_type
+    
+    def _is_hierarchy_array(self, node: HDLNode) -> bool:
+        """Check whether a scope node is a hierarchy array (e.g. a generate block)."""
+        return node.is_scope and self._ha_short in node.py_type
 
 def generate_stub(hierarchy: HierarchyDict, out_dir: Path) -> Path:
     return StubGenerator().generate_stub(hierarchy, out_dir)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+from copra.discovery import HierarchyDict, HDLNode
+from copra.generation import generate_stub
+
+
+def test_stub_generation_survives_hierarchy_deeper_than_recursion_limit(tmp_path: Path):
+    """Test that a scope chain deeper than the recursion limit still generates every class."""
+    hierarchy = HierarchyDict()
+    depth = sys.getrecursionlimit() + 100
+    
+    path = "top"
+    for level in range(depth):
+        node = HDLNode(path=path, py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True)
+        hierarchy._nodes[path] = node # type: ignore
+        hierarchy._build_tree_node(node) # type: ignore
+        path = f"{path}.s{level}"
+    
+    stub_path = generate_stub(hierarchy, tmp_path)
+    content = stub_path.read_text()
+    
+    # Every scope but the innermost leaf has a child, so each one gets a class
+    assert content.count("\nclass ") == depth - 1
+    assert f"s{depth - 3}: S{depth - 3}" in content
@@ -1,3 +1,4 @@
+import ast
 from pathlib import Path
 from copra.discovery import HierarchyDict, HDLNode
 from copra.generation import generate_stub
@@ -51,3 +52,46 @@ def test_stub_handles_underscore_module_names(tmp_path: Path):
     stub_path = generate_stub(hierarchy, tmp_path)
     content = stub_path.read_text()
     assert "class MyComplexModule(" in content, f"Expected 'class MyComplexModule(' but got:\n{content}"
+
+
+def test_stub_defines_class_for_first_nested_scope(tmp_path: Path):
+    """Test that a scope discovered first among its siblings still gets a class."""
+    hierarchy = HierarchyDict()
+    
+    nodes = [
+        HDLNode(path="top", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.first_sub", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.first_sub.s", py_type="cocotb.handle.LogicObject", width=None, is_scope=False),
+        HDLNode(path="top.other", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.other.t", py_type="cocotb.handle.LogicObject", width=None, is_scope=False),
+    ]
+    for node in nodes:
+        hierarchy._nodes[node.path] = node # type: ignore
+        hierarchy._build_tree_node(node) # type: ignore
+    
+    stub_path = generate_stub(hierarchy, tmp_path)
+    content = stub_path.read_text()
+    
+    assert "first_sub: FirstSub" in content, f"Expected 'first_sub: FirstSub' but got:\n{content}"
+    assert "class FirstSub(" in content, f"Expected 'class FirstSub(' but got:\n{content}"
+    assert "class Other(" in content, f"Expected 'class Other(' but got:\n{content}"
+
+
+def test_stub_top_class_with_only_array_elements_gets_pass(tmp_path: Path):
+    """Test that a top class whose children are all array elements still has a valid body."""
+    hierarchy = HierarchyDict()
+    
+    nodes = [
+        HDLNode(path="top", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.gen[0]", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.gen[1]", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+    ]
+    for node in nodes:
+        hierarchy._nodes[node.path] = node # type: ignore
+        hierarchy._build_tree_node(node) # type: ignore
+    
+    stub_path = generate_stub(hierarchy, tmp_path)
+    content = stub_path.read_text()
+    
+    assert "class Top(cocotb.handle.HierarchyObject):\n    pass\n" in content, f"Expected an empty Top class but got:\n{content}"
+    ast.parse(content)
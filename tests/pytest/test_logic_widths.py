@@ -0,0 +1,33 @@
+from copra.discovery import HierarchyDict, HDLNode
+
+
+def _add(hierarchy: HierarchyDict, node: HDLNode) -> None:
+    hierarchy._nodes[node.path] = node # type: ignore
+    hierarchy._build_tree_node(node) # type: ignore
+
+
+def test_logic_widths_refresh_when_nodes_are_added():
+    """Test that cached LogicArray widths pick up nodes added after the first lookup."""
+    hierarchy = HierarchyDict()
+    
+    _add(hierarchy, HDLNode(path="dut", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True))
+    _add(hierarchy, HDLNode(path="dut.data", py_type="cocotb.handle.LogicArrayObject", width=8, is_scope=False))
+    _add(hierarchy, HDLNode(path="dut.clk", py_type="cocotb.handle.LogicObject", width=1, is_scope=False))
+    
+    assert hierarchy.logic_widths == {8}
+    assert hierarchy.logic_widths is hierarchy.logic_widths
+    
+    _add(hierarchy, HDLNode(path="dut.addr", py_type="cocotb.handle.LogicArrayObject", width=16, is_scope=False))
+    assert hierarchy.logic_widths == {8, 16}
+
+
+def test_logic_widths_skip_scopes_and_width_less_nodes():
+    """Test that only LogicArray signals with a known width contribute a width."""
+    hierarchy = HierarchyDict()
+    
+    _add(hierarchy, HDLNode(path="dut", py_type="cocotb.handle.LogicArrayObject", width=4, is_scope=True))
+    _add(hierarchy, HDLNode(path="dut.bus", py_type="cocotb.handle.LogicArrayObject", width=None, is_scope=False))
+    _add(hierarchy, HDLNode(path="dut.data", py_type="cocotb.handle.LogicArrayObject", width=8, is_scope=False))
+    
+    assert hierarchy.logic_widths == {8}
+    assert [node.logic_array_width for node in hierarchy.get_nodes()] == [None, None, 8]
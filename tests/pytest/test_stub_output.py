@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import pytest
+
+from copra.discovery import HierarchyDict, HDLNode
+from copra.generation import StubGenerator, generate_stub
+
+
+def test_failed_generation_keeps_previous_stub(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that an error mid-walk leaves the previous stub intact and no temp file behind."""
+    hierarchy = HierarchyDict()
+    
+    nodes = [
+        HDLNode(path="top", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True),
+        HDLNode(path="top.clk", py_type="cocotb.handle.LogicObject", width=None, is_scope=False),
+    ]
+    for node in nodes:
+        hierarchy._nodes[node.path] = node # type: ignore
+        hierarchy._build_tree_node(node) # type: ignore
+    
+    stub_path = generate_stub(hierarchy, tmp_path)
+    good_content = stub_path.read_text()
+    
+    def fail_walk(*args: object, **kwargs: object) -> None:
+        raise RuntimeError("walk failed")
+    
+    monkeypatch.setattr(StubGenerator, "_walk", fail_walk)
+    with pytest.raises(RuntimeError, match="walk failed"):
+        generate_stub(hierarchy, tmp_path)
+    
+    assert stub_path.read_text() == good_content
+    assert sorted(p.name for p in tmp_path.iterdir()) == [stub_path.name]
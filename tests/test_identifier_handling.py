@@ -5,18 +5,29 @@
 Test cases for SystemVerilog identifier handling in stub generation.
 """
 
+from pathlib import Path
+from typing import Dict, List
+
 import pytest
-from typing import Dict, Any
 
-from copra.generation import StubGenerator
+from copra.discovery import HierarchyDict, HDLNode
+from copra.generation import generate_stub
 
 
 class TestIdentifierHandling:
     """Test SystemVerilog identifier handling in stub generation."""
     
-    def setup_method(self):
-        """Set up test fixtures."""
-        self.generator = StubGenerator()
+    def _generate_dut_lines(self, signals: Dict[str, str], tmp_path: Path) -> List[str]:
+        """Generate a stub for a ``dut`` scope holding the given signals."""
+        hierarchy = HierarchyDict()
+        nodes = [HDLNode(path="dut", py_type="cocotb.handle.HierarchyObject", width=None, is_scope=True)]
+        for name, py_type in signals.items():
+            nodes.append(HDLNode(path=f"dut.{name}", py_type=py_type, width=None, is_scope=False))
+        for node in nodes:
+            hierarchy._nodes[node.path] = node  # type: ignore[reportPrivateUsage]
+            hierarchy._build_tree_node(node)  # type: ignore[reportPrivateUsage]
+        
+        return generate_stub(hierarchy, tmp_path).read_text().splitlines()
 
     @pytest.mark.parametrize("signal_name,expected_literal", [
         ("clk", "Literal['clk']"),
@@ -45,16 +56,13 @@ class TestIdentifierHandling:
             f"but got {actual_literal}"
         )
     
-    def test_getitem_overload_generation(self):
+    def test_getitem_overload_generation(self, tmp_path: Path):
         """Test that __getitem__ overloads are generated correctly."""
-        children: Dict[str, Any] = {
-            "clk": {"_node": MockNode("clk", "cocotb.handle.LogicObject", False)},
-            "_reset_n": {"_node": MockNode("_reset_n", "cocotb.handle.LogicObject", False)},
-            "!special!\\": {"_node": MockNode("!special!\\", "cocotb.handle.LogicObject", False)},
-        }
-        
-        lines = []
-        self.generator._generate_getitem_overloads(lines, children, "    ")
+        lines = self._generate_dut_lines({
+            "clk": "cocotb.handle.LogicObject",
+            "_reset_n": "cocotb.handle.LogicObject",
+            "!special!\\": "cocotb.handle.LogicObject",
+        }, tmp_path)
         
         overload_lines = [line for line in lines if "def __getitem__" in line]
         
@@ -70,19 +78,16 @@ class TestIdentifierHandling:
                 f"Expected overload {expected} not found in generated lines: {overload_lines}"
             )
     
-    def test_attribute_vs_getitem_access(self):
+    def test_attribute_vs_getitem_access(self, tmp_path: Path):
         """Test that signals get appropriate access methods based on Python validity."""
-        children: Dict[str, Any] = {
-            "valid_identifier": {"_node": MockNode("valid_identifier", "cocotb.handle.LogicObject", False)},
-            "_underscore_start": {"_node": MockNode("_underscore_start", "cocotb.handle.LogicObject", False)},
-            "!invalid!\\\\": {"_node": MockNode("!invalid!\\\\", "cocotb.handle.LogicObject", False)},
-        }
+        lines = self._generate_dut_lines({
+            "valid_identifier": "cocotb.handle.LogicObject",
+            "_underscore_start": "cocotb.handle.LogicObject",
+            "!invalid!\\\\": "cocotb.handle.LogicObject",
+        }, tmp_path)
         
-        attr_lines = []
-        self.generator._generate_class_attributes(attr_lines, children, "    ")
-        
-        getitem_lines = []
-        self.generator._generate_getitem_overloads(getitem_lines, children, "    ")
+        attr_lines = [line for line in lines if line.startswith("    ") and not line.lstrip().startswith(("@", "def "))]
+        getitem_lines = [line for line in lines if "def __getitem__" in line]
         
         # valid_identifier should have both attribute and __getitem__ access
         assert any("valid_identifier:" in line for line in attr_lines)
@@ -94,12 +99,3 @@ class TestIdentifierHandling:
         assert not any("!invalid!" in line for line in attr_lines)
         assert any("'!invalid!\\\\'" in line for line in getitem_lines)
 
-
-class MockNode:
-    """Mock node for testing."""
-    
-    def __init__(self, name: str, py_type: str, is_scope: bool):
-        self.path = name
-        self.py_type = py_type
-        self.is_scope = is_scope
-        self.width = None
@@ -113,8 +113,6 @@ def test_many_signals_have_stable_ordering():
 import cocotb.handle
 import cocotb.types
 from typing import overload, Literal
-from typing import NewType
-
 
 # This file was automatically generated by copra
 # It provides type stubs for your HDL design for use with cocotb